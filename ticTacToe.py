@@ -5,6 +5,9 @@ import random
 import pprint
 import copy
 import time
+import math
+import multiprocessing as mp
+from statistics import NormalDist
 from tqdm import tqdm
 
 '''
@@ -12,18 +15,42 @@ Board Class for TicTacToe Game
 '''
 class TTTBoard:
 
-    def __init__(self):
+    def __init__(self, rows: int = 3, cols: int = 3, win_length: int = 3):
         '''
         _player_tokens : { 
             1: "X", 
             2: "O", ...
         }
+        win_length : number of tokens in a row needed to win
         '''
-        self._rows  = 3
-        self._cols  = 3 
+        self._rows  = rows
+        self._cols  = cols 
+        self._win_length = win_length
         self._board = np.zeros(self._rows * self._cols, dtype=int)
+        self._place_values = 3 ** np.arange(self.size() - 1, -1, -1, dtype=np.int64)
+        self._lines = self._buildLines()
+        self._lines_through = {
+            position: [line for line in self._lines if position in line] for position in range(self.size())
+        }
         self._player_tokens = { }
 
+    def _buildLines(self):
+        '''
+        Returns a list of every winning line on the board
+        Each line is a tuple of win_length positions
+        '''
+        lines = []
+        k = self._win_length
+        for row in range(self._rows):
+            for col in range(self._cols):
+                # right, down, down-right, down-left
+                for d_row, d_col in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_row = row + d_row * (k - 1)
+                    end_col = col + d_col * (k - 1)
+                    if end_row < self._rows and 0 <= end_col < self._cols:
+                        lines.append(tuple((row + d_row * i) * self._cols + col + d_col * i for i in range(k)))
+        return lines
+
     @staticmethod
     def validMovesForHash(board_hash: str):
         '''
@@ -62,6 +89,18 @@ class TTTBoard:
         '''
         return (self._rows * self._cols)
 
+    def getDimensions(self):
+        '''
+        Returns (rows, cols, win_length)
+        '''
+        return (self._rows, self._cols, self._win_length)
+
+    def getWinningLines(self):
+        '''
+        Returns list of winning lines - each line is a tuple of positions
+        '''
+        return list(self._lines)
+
     def getPlayerTokens(self):
         '''
         Returns list of all player tokens
@@ -114,26 +153,30 @@ class TTTBoard:
     def checkForWinner(self):
         '''
         Checks the tokens in each column row and diagonal
+        Returns the winning token or None
         '''
-        # Check columns
-        if self._board[0] == self._board[3] and self._board[3] == self._board[6] and self._board[0]: return self._getPlayerToken(self._board[0])
-        if self._board[1] == self._board[4] and self._board[4] == self._board[7] and self._board[1]: return self._getPlayerToken(self._board[1])
-        if self._board[2] == self._board[5] and self._board[5] == self._board[8] and self._board[2]: return self._getPlayerToken(self._board[2])
-        # Check rows
-        if self._board[0] == self._board[1] and self._board[1] == self._board[2] and self._board[0]: return self._getPlayerToken(self._board[0])
-        if self._board[3] == self._board[4] and self._board[4] == self._board[5] and self._board[3]: return self._getPlayerToken(self._board[3])
-        if self._board[6] == self._board[7] and self._board[7] == self._board[8] and self._board[6]: return self._getPlayerToken(self._board[6])
-        # Check diagonals
-        if self._board[0] == self._board[4] and self._board[4] == self._board[8] and self._board[0]: return self._getPlayerToken(self._board[0])
-        if self._board[2] == self._board[4] and self._board[4] == self._board[6] and self._board[2]: return self._getPlayerToken(self._board[2])
+        for line in self._lines:
+            first = self._board[line[0]]
+            if first and all(self._board[pos] == first for pos in line[1:]):
+                return self._getPlayerToken(first)
+        return None
 
+    def checkForWinnerAt(self, position: int):
+        '''
+        Checks only the lines through position - enough after a single move
+        Returns the winning token or None
+        '''
+        for line in self._lines_through[position]:
+            first = self._board[line[0]]
+            if first and all(self._board[pos] == first for pos in line[1:]):
+                return self._getPlayerToken(first)
         return None
 
     def isFull(self):
         '''
         Check if the board is full
         '''
-        for i in range(9):
+        for i in range(self.size()):
             if self.positionAvailable(i): return False
         return True
 
@@ -192,6 +235,41 @@ class TTTBoard:
         hash_str = "".join(board)
         return hash_str
 
+    def isPlayableHash(self, board_hash: str):
+        '''
+        Checks whether a hash is a state a player can be asked to move from :
+        right length, only 0, 1 and 2, players at most one move apart,
+        no winner yet and at least one open position
+        '''
+        if type(board_hash) != str or len(board_hash) != self.size(): return False
+        if not set(board_hash) <= set("012") or "0" not in board_hash: return False
+        if abs(board_hash.count("1") - board_hash.count("2")) > 1: return False
+        for line in self._lines:
+            first = board_hash[line[0]]
+            if first != "0" and all(board_hash[pos] == first for pos in line[1:]): return False
+        return True
+
+    def setHash(self, board_hash: str):
+        '''
+        Set board to the state given by a hash value
+        '''
+        self._board = np.array([int(val) for val in board_hash], dtype=int)
+
+    @staticmethod
+    def keyForHash(board_hash: str):
+        '''
+        Returns the integer state key for a board state hash
+        The hash is read as a base 3 number : i.e. "000000001" = 1
+        '''
+        return int(board_hash, 3)
+
+    def getKey(self):
+        '''
+        Returns the integer state key for current board state
+        Same as keyForHash(getHash()) without building the string
+        '''
+        return int(self._board @ self._place_values)
+
 
 '''
 Player Class for TicTacToe Game
@@ -230,6 +308,14 @@ class TTTPlayer(ABC):
         rand_idx    = random.randint(0, len(valid_moves) - 1)
         return valid_moves[rand_idx]
 
+    def getPolicyMove(self, board: TTTBoard):
+        '''
+        Returns the move the player would serve, without any exploration
+        None if the player has no move for this state
+        Used when compiling a player into a TTTFrozenAgent
+        '''
+        return self.getMove(board)
+
     @abstractmethod
     def passReward(self, reward: float, state_actions: list):
         pass
@@ -239,16 +325,36 @@ class TTTPlayer(ABC):
         pass
 
 
+'''
+Worker process state for TicTacToe.evaluate
+Each worker keeps its own copy of the game so agent caches survive between batches
+'''
+_eval_game = None
+
+def _initEvalWorker(game):
+    global _eval_game
+    _eval_game = game
+
+def _evalBatch(num_games: int, seed: int):
+    '''
+    Play a batch of test games in a worker, returns list of winners
+    '''
+    random.seed(seed)
+    np.random.seed(seed % (2 ** 32))
+    return [result["winner"] for result in _eval_game.test(num_games)]
+
+
 '''
 Class to run a game between two players
 '''
 class TicTacToe:
 
-    def __init__(self, p_1: TTTPlayer, p_2: TTTPlayer, display: bool = False):
+    def __init__(self, p_1: TTTPlayer, p_2: TTTPlayer, display: bool = False,
+                 rows: int = 3, cols: int = 3, win_length: int = 3):
         '''
         _results : all actions and board states of each game
         '''
-        self._board   = TTTBoard()
+        self._board   = TTTBoard(rows, cols, win_length)
         self._players = [{
             "player"       : p_1,
             "player_num"   : 1,
@@ -315,23 +421,12 @@ class TicTacToe:
             game_results = self.playGame()
             game_results["game_num"] = len(results) + 1
             results.append(game_results)
-            # run 500 tests if show_results argument is True
+            # evaluate (up to 500 games) if show_results argument is True
             if show_results and not (game + 1) % mod:
-                test_results = self.test(500)
-                p_1_wins = 0
-                p_2_wins = 0
-                draws    = 0
-                for x in range(len(test_results)):
-                    game = test_results[x]
-                    if game["winner"] == player_1.getToken():
-                        p_1_wins += 1
-                    elif game["winner"] == "draw":
-                        draws += 1
-                    else:
-                        p_2_wins += 1
-                p_1_results.append(p_1_wins/len(test_results))
-                p_2_results.append(p_2_wins/len(test_results))
-                draw_results.append(draws/len(test_results))
+                test_results = self.evaluate(max_games=500, precision=0.03)
+                p_1_results.append(test_results["p_1"][0])
+                p_2_results.append(test_results["p_2"][0])
+                draw_results.append(test_results["draw"][0])
 
         if show_results: self.graphRewards(p_1_results, p_2_results, draw_results, x_scale=mod)
         self._display = False
@@ -365,7 +460,7 @@ class TicTacToe:
         ax2.plot(x, p_2, "tab:red")
         ax3.plot(x, draws, "tab:green")
         fig.text(0.5, 0.04, "Games Trained", ha="center", va="center")
-        fig.text(0.06, 0.5, "Win Rate - 500 Games", ha="center", va="center", rotation="vertical")     
+        fig.text(0.06, 0.5, "Win Rate", ha="center", va="center", rotation="vertical")     
         plt.show()
     
     @staticmethod
@@ -406,6 +501,117 @@ class TicTacToe:
         '''
         return self._board.getHash()
 
+    @staticmethod
+    def _wilsonInterval(successes: int, total: int, z: float):
+        '''
+        Returns (rate, low, high) : Wilson score interval for a binomial rate
+        No games tells nothing about the rate : (0, 0, 1)
+        '''
+        if total == 0: return (0.0, 0.0, 1.0)
+        rate   = successes / total
+        denom  = 1 + z ** 2 / total
+        center = (rate + z ** 2 / (2 * total)) / denom
+        half   = z * math.sqrt(rate * (1 - rate) / total + z ** 2 / (4 * total ** 2)) / denom
+        return (rate, max(0.0, center - half), min(1.0, center + half))
+
+    @staticmethod
+    def _sprtLLR(p_1_wins: int, draws: int, total: int, score_0: float, score_1: float):
+        '''
+        Log likelihood ratio of player 1 score (win = 1, draw = 0.5) being
+        score_1 rather than score_0, normal approximation of the GSPRT
+        '''
+        mean = (p_1_wins + 0.5 * draws) / total
+        var  = (p_1_wins + 0.25 * draws) / total - mean ** 2
+        var  = max(var, 1e-6)
+        return total * (score_1 - score_0) * (2 * mean - score_0 - score_1) / (2 * var)
+
+    def evaluate(self, max_games: int = 500, precision: float = 0.05, confidence: float = 0.95,
+                 sprt: tuple = None, sprt_error: float = 0.05, batch_size: int = 50,
+                 num_processes: int = 1, show_results: bool = False):
+        '''
+        Play test games in batches until the results are known well enough
+        precision  : stop once every rate's confidence interval is within +/- precision
+        sprt       : (score_0, score_1) - also stop once a sequential probability ratio
+                     test decides player 1's score is score_0 or score_1
+                     i.e. (0.45, 0.55) : is player 1 weaker or stronger than player 2
+        sprt_error : type 1 and type 2 error rate of the sprt
+        num_processes : play this many batches at once in separate processes
+        Returns {
+            "games"   : games played,
+            "p_1"     : (rate, low, high),
+            "p_2"     : (rate, low, high),
+            "draw"    : (rate, low, high),
+            "stopped" : "precision", "sprt_h0", "sprt_h1" or "max_games"
+        }
+        '''
+        if max_games < 0: raise ValueError("max_games must be at least 0, got {}".format(max_games))
+        if batch_size < 1: raise ValueError("batch_size must be at least 1, got {}".format(batch_size))
+        if num_processes < 1: raise ValueError("num_processes must be at least 1, got {}".format(num_processes))
+
+        player_1 = [p["player"] for p in self._players if p["player_num"] == 1][0]
+        z        = NormalDist().inv_cdf((1 + confidence) / 2)
+        llr_low  = math.log(sprt_error / (1 - sprt_error))
+        llr_high = math.log((1 - sprt_error) / sprt_error)
+
+        pool = None
+        if num_processes > 1:
+            pool = mp.Pool(num_processes, initializer=_initEvalWorker, initargs=(self,))
+
+        p_1_wins = 0
+        draws    = 0
+        total    = 0
+        stopped  = "max_games"
+        rates    = [self._wilsonInterval(0, 0, z)] * 3
+        try:
+            while total < max_games:
+                # one batch per process, trimmed so max_games isn't passed
+                batches = []
+                remaining = max_games - total
+                for _ in range(num_processes):
+                    if remaining <= 0: break
+                    batches.append(min(batch_size, remaining))
+                    remaining -= batches[-1]
+                if pool is not None:
+                    seeds   = [random.getrandbits(32) for _ in batches]
+                    winners = [w for batch in pool.starmap(_evalBatch, zip(batches, seeds)) for w in batch]
+                else:
+                    winners = [result["winner"] for result in self.test(batches[0])]
+                p_1_wins += winners.count(player_1.getToken())
+                draws    += winners.count("draw")
+                total    += len(winners)
+
+                rates = [self._wilsonInterval(count, total, z) for count in [p_1_wins, total - p_1_wins - draws, draws]]
+                if all(high - low <= 2 * precision for _, low, high in rates):
+                    stopped = "precision"
+                    break
+                if sprt is not None:
+                    llr = self._sprtLLR(p_1_wins, draws, total, sprt[0], sprt[1])
+                    if llr >= llr_high:
+                        stopped = "sprt_h1"
+                        break
+                    if llr <= llr_low:
+                        stopped = "sprt_h0"
+                        break
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        results = {
+            "games"  : total,
+            "p_1"    : rates[0],
+            "p_2"    : rates[1],
+            "draw"   : rates[2],
+            "stopped": stopped
+        }
+        if show_results:
+            print("Games    : {} ({})".format(total, stopped))
+            for name, key in [("Player 1", "p_1"), ("Player 2", "p_2"), ("Draws   ", "draw")]:
+                rate, low, high = results[key]
+                print("{} : {:.1f}% [{:.1f}%, {:.1f}%]".format(name, 100 * rate, 100 * low, 100 * high))
+            print()
+        return results
+
     def test(self, num_games: int, show_results: bool = False, show_game: bool = False):
         '''
         Disable agent training and play through a number of games
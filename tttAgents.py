@@ -6,6 +6,9 @@ import pprint
 import random
 import operator
 import math
+import sys
+import copy
+import numpy as np
 
 class TTTHumanAgent(TTTPlayer):
 
@@ -32,10 +35,133 @@ class TTTRandomAgent(TTTPlayer):
     def passReward(self, reward: float, state_actions: list):
         pass
 
+    def getPolicyMove(self, board: TTTBoard):
+        '''
+        No fixed move - a compiled random agent stays random
+        '''
+        return None
+
     def getMove(self, board: TTTBoard):
         return self.getRandomMove(board)
 
 
+'''
+Q values of one state in a TTTPackedQTable, used like { pos_val: q_val }
+'''
+class _PackedRow:
+
+    def __init__(self, values: np.ndarray):
+        self._values = values
+
+    def __getitem__(self, move: int):
+        value = self._values[move]
+        if np.isnan(value): raise KeyError(move)
+        return float(value)
+
+    def __setitem__(self, move: int, value: float):
+        self._values[move] = value
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return [int(move) for move in np.nonzero(~np.isnan(self._values))[0]]
+
+    def values(self):
+        return [float(self._values[move]) for move in self.keys()]
+
+    def items(self):
+        return [(move, float(self._values[move])) for move in self.keys()]
+
+
+'''
+Compact q table built by TTTQAgent.compactQTable
+State keys (see TTTBoard.keyForHash) are kept in a sorted int array and q values
+in a (states, board size) float32 array, NaN where a move isn't available
+Supports the dict operations TTTQAgent uses. States added after packing are
+kept in a regular dict until the next compaction
+'''
+class TTTPackedQTable:
+
+    def __init__(self, q_table: dict, board_size: int = 9):
+        hashes           = sorted(q_table.keys(), key=TTTBoard.keyForHash)
+        self._board_size = board_size
+        self._keys       = np.array([TTTBoard.keyForHash(h) for h in hashes],
+                                    dtype=np.int32 if 3 ** board_size < 2 ** 31 else np.int64)
+        self._values     = np.full((len(hashes), board_size), np.nan, dtype=np.float32)
+        for row, board_hash in enumerate(hashes):
+            for move, value in q_table[board_hash].items():
+                self._values[row, move] = value
+        self._extra = { }
+
+    def _row(self, board_hash: str):
+        '''
+        Returns row index of a state in the packed arrays, None if not packed
+        '''
+        if type(board_hash) != str or len(board_hash) != self._board_size: return None
+        try: key = TTTBoard.keyForHash(board_hash)
+        except ValueError: return None
+        row = int(np.searchsorted(self._keys, key))
+        if row < self._keys.shape[0] and self._keys[row] == key: return row
+        return None
+
+    def __contains__(self, board_hash: str):
+        return board_hash in self._extra or self._row(board_hash) is not None
+
+    def __getitem__(self, board_hash: str):
+        if board_hash in self._extra: return self._extra[board_hash]
+        row = self._row(board_hash)
+        if row is None: raise KeyError(board_hash)
+        return _PackedRow(self._values[row])
+
+    def __setitem__(self, board_hash: str, moves: dict):
+        row = self._row(board_hash)
+        if row is None:
+            self._extra[board_hash] = moves
+            return
+        self._values[row] = np.nan
+        for move, value in moves.items():
+            self._values[row, move] = value
+
+    def __len__(self):
+        return self._keys.shape[0] + len(self._extra)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, board_hash: str, default=None):
+        try: return self[board_hash]
+        except KeyError: return default
+
+    def keys(self):
+        packed = [np.base_repr(key, 3).zfill(self._board_size) for key in self._keys]
+        return packed + list(self._extra.keys())
+
+    def items(self):
+        return [(board_hash, self[board_hash]) for board_hash in self.keys()]
+
+    def copy(self):
+        '''
+        Returns a regular dict, rows are copied out of the packed arrays
+        '''
+        return self.toDict()
+
+    def toDict(self):
+        '''
+        Returns the table as a regular { "hash": { pos_val: q_val } } dict
+        '''
+        return {board_hash: dict(moves.items()) for board_hash, moves in self.items()}
+
+    def nbytes(self):
+        '''
+        Returns the size of the table in bytes
+        '''
+        return self._keys.nbytes + self._values.nbytes + TTTQAgent.dictTableBytes(self._extra)
+
+
 '''
 Agent Class for TicTacToe Game
 For use by automated player
@@ -66,6 +192,13 @@ class TTTQAgent(TTTPlayer):
         self._q_table     = { 
             # "hash": { pos_val: q_val }, ...
         }
+        # board matching the dimensions the agent plays on, see _isPlayable
+        self._state_check     = None
+        self._games_trained   = 0
+        self._memory_every    = 1000
+        self._memory_history  = [
+            # { "games": games trained, "states": num states, "bytes": table size }, ...
+        ]
 
     def _getMaxQMove(self, board: TTTBoard):
         '''
@@ -90,10 +223,21 @@ class TTTQAgent(TTTPlayer):
             #input()
             return max([moves[key] for key in moves.keys()])
         except:
+            # states that can't be played have no future value - don't store them
+            if not self._isPlayable(state_hash): return 0
             moves = TTTBoard.validMovesForHash(state_hash)
             self._addHash(state_hash, moves)
             return self._getMaxQFromHash(state_hash)
 
+    def _isPlayable(self, state_hash: str):
+        '''
+        Checks state_hash with TTTBoard.isPlayableHash on a board with the
+        dimensions the agent plays on, set by getMove
+        Every state is kept until the agent has seen a board
+        '''
+        if self._state_check is None: return True
+        return self._state_check.isPlayableHash(state_hash)
+
     def _addHash(self, board_hash: str, available_moves: list):
         '''
         Add hash to state table
@@ -117,11 +261,9 @@ class TTTQAgent(TTTPlayer):
         '''
         Set state action's q value to new value
         '''
-        try:
-            self._q_table[state_hash][action] += new_value
-        except:
+        if state_hash not in self._q_table:
             self._addHash(state_hash, TTTBoard.validMovesForHash(state_hash))
-            self._q_table[state_hash][action] = new_value
+        self._q_table[state_hash][action] = new_value
 
     def setEpsilonDecay(self, decay: float):
         '''
@@ -129,18 +271,109 @@ class TTTQAgent(TTTPlayer):
         '''
         self._epsi_decay = decay
 
+    def setEpsilon(self, epsilon: float):
+        '''
+        Set exploration rate
+        '''
+        self._epsilon = epsilon
+
+    def setHyperparameters(self, alpha: float, discount: float, epsi_decay: float, epsi_min: float):
+        '''
+        Set learning rate, discount factor and exploration decay
+        '''
+        self._alpha      = alpha
+        self._discount   = discount
+        self._epsi_decay = epsi_decay
+        self._epsi_min   = epsi_min
+
     def getQTable(self):
         '''
         Returns a copy of the q table
         '''
         return self._q_table.copy()
 
+    def setQTable(self, q_table: dict):
+        '''
+        Replace the q table
+        '''
+        self._q_table = q_table
+
     def getEpsilon(self):
         '''
         Return epsilon value
         '''
         return self._epsilon
 
+    @staticmethod
+    def dictTableBytes(q_table: dict):
+        '''
+        Returns the approximate size in bytes of a { "hash": { pos_val: q_val } } table
+        '''
+        total = sys.getsizeof(q_table)
+        for state_hash, moves in q_table.items():
+            total += sys.getsizeof(state_hash) + sys.getsizeof(moves)
+            total += sum(sys.getsizeof(value) for value in moves.values())
+        return total
+
+    def getMemoryUsage(self):
+        '''
+        Returns {
+            "states" : number of states in the q table,
+            "bytes"  : approximate size of the q table,
+            "packed" : whether the table has been packed by compactQTable
+        }
+        '''
+        packed = isinstance(self._q_table, TTTPackedQTable)
+        return {
+            "states": len(self._q_table),
+            "bytes" : self._q_table.nbytes() if packed else TTTQAgent.dictTableBytes(self._q_table),
+            "packed": packed
+        }
+
+    def setMemorySampling(self, sample_every: int):
+        '''
+        Set how many training games pass between memory usage samples
+        '''
+        self._memory_every = sample_every
+
+    def getMemoryHistory(self):
+        '''
+        Returns list of memory usage samples taken while training
+        '''
+        return list(self._memory_history)
+
+    def compactQTable(self, pack: bool = True, rows: int = None, cols: int = None, win_length: int = None):
+        '''
+        Drop states that can't be played (see TTTBoard.isPlayableHash) and
+        moves that aren't open, then optionally pack the table into a
+        TTTPackedQTable - q values are stored as float32 once packed
+        rows, cols, win_length : board the states are checked against,
+                                 None for the board the agent plays on
+        Returns { "states_before", "states_after", "bytes_before", "bytes_after" }
+        '''
+        if rows is not None and cols is not None and win_length is not None:
+            check = TTTBoard(rows, cols, win_length)
+        elif self._state_check is not None:
+            check = self._state_check
+        else:
+            raise ValueError("Board dimensions unknown - pass rows, cols and win_length or play a game first")
+        before = self.getMemoryUsage()
+        table  = self._q_table.toDict() if before["packed"] else self._q_table
+        compacted = { }
+        for state_hash, moves in table.items():
+            if not check.isPlayableHash(state_hash): continue
+            open_moves = TTTBoard.validMovesForHash(state_hash)
+            compacted[state_hash] = {move: value for move, value in moves.items() if move in open_moves}
+        if pack: self._q_table = TTTPackedQTable(compacted, check.size())
+        else: self._q_table = compacted
+        after = self.getMemoryUsage()
+        return {
+            "states_before": before["states"],
+            "states_after" : after["states"],
+            "bytes_before" : before["bytes"],
+            "bytes_after"  : after["bytes"]
+        }
+
     def trainAgent(self, train: bool):
         '''
         Set memeber that denotes whether the model should be training or not
@@ -153,7 +386,8 @@ class TTTQAgent(TTTPlayer):
             new_value = curr_q_value + ( self._alpha * ( (self._discount * self._getMaxQFromHash(next_state) )  - curr_q_value ) )
             self._q_table[curr_state][curr_action] = new_value
         except:
-            self._addHash(curr_state, TTTBoard.validMovesForHash(curr_state))
+            if self._isPlayable(curr_state):
+                self._addHash(curr_state, TTTBoard.validMovesForHash(curr_state))
 
     def passReward(self, reward: float, state_actions: list):
         '''
@@ -177,7 +411,7 @@ class TTTQAgent(TTTPlayer):
                 curr_hash   = state_actions[i][0]
                 curr_action = state_actions[i][1]
                 self._updateQValue(curr_action, curr_hash, next_hash)
-                next_hash = curr_action
+                next_hash = curr_hash
                 next_action = curr_action
                 i -= 1
 
@@ -185,6 +419,24 @@ class TTTQAgent(TTTPlayer):
             if self._epsilon >= self._epsi_min:
                 self._epsilon *= self._epsi_decay    
 
+            self._games_trained += 1
+            if not self._games_trained % self._memory_every:
+                usage = self.getMemoryUsage()
+                self._memory_history.append({
+                    "games" : self._games_trained,
+                    "states": usage["states"],
+                    "bytes" : usage["bytes"]
+                })
+
+    def getPolicyMove(self, board: TTTBoard):
+        '''
+        Returns move with the highest q value, None if state not in table
+        Unlike _getMaxQMove the table is left unchanged
+        '''
+        moves = self._q_table.get(board.getHash())
+        if not moves: return None
+        return max(moves.items(), key=operator.itemgetter(1))[0]
+
     def getMove(self, board: TTTBoard):
         '''
         Policy : get hash value of current borad state
@@ -192,6 +444,8 @@ class TTTQAgent(TTTPlayer):
                  choose move with highest value
                  if multiple moves have the same value, pick randomly
         '''
+        if self._state_check is None or self._state_check.getDimensions() != board.getDimensions():
+            self._state_check = TTTBoard(*board.getDimensions())
         if random.uniform(0, 1) > self._epsilon: 
             return self._getMaxQMove(board)
         else: return self.getRandomMove(board)
@@ -321,6 +575,357 @@ class TTTMiniMaxAgent(TTTPlayer):
         return best_move
 
 
+'''
+Small multilayer perceptron : inputs -> tanh hidden layer -> tanh output
+Forward and backward passes work on a whole batch of inputs at once
+'''
+class TTTMLP:
+
+    def __init__(self, num_inputs: int, num_hidden: int = 64, learning_rate: float = 0.01):
+        self._lr  = learning_rate
+        self._w_1 = np.random.normal(0, 1 / math.sqrt(num_inputs), (num_inputs, num_hidden))
+        self._b_1 = np.zeros(num_hidden)
+        self._w_2 = np.random.normal(0, 1 / math.sqrt(num_hidden), (num_hidden, 1))
+        self._b_2 = np.zeros(1)
+
+    def forward(self, inputs: np.ndarray):
+        '''
+        inputs : (batch, num_inputs)
+        Returns array of batch output values between -1 and 1
+        '''
+        hidden = np.tanh(inputs @ self._w_1 + self._b_1)
+        return np.tanh(hidden @ self._w_2 + self._b_2)[:, 0]
+
+    def train(self, inputs: np.ndarray, targets: np.ndarray):
+        '''
+        One gradient descent step on the squared error of the batch
+        Returns the mean squared error before the step
+        '''
+        hidden = np.tanh(inputs @ self._w_1 + self._b_1)
+        output = np.tanh(hidden @ self._w_2 + self._b_2)[:, 0]
+        error  = output - targets
+
+        d_output = (error * (1 - output ** 2))[:, None]
+        d_hidden = (d_output @ self._w_2.T) * (1 - hidden ** 2)
+        self._w_2 -= self._lr * (hidden.T @ d_output)
+        self._b_2 -= self._lr * d_output.sum(axis=0)
+        self._w_1 -= self._lr * (inputs.T @ d_hidden)
+        self._b_1 -= self._lr * d_hidden.sum(axis=0)
+        return float((error ** 2).mean())
+
+    def nbytes(self):
+        '''
+        Returns the size of the network parameters in bytes
+        '''
+        return self._w_1.nbytes + self._b_1.nbytes + self._w_2.nbytes + self._b_2.nbytes
+
+
+'''
+Agent that scores the board after each legal move with a TTTMLP
+Values are from the agent's point of view : 1 win, 0 draw, -1 loss
+Two agents can share one network for self-play
+'''
+class TTTValueNetAgent(TTTPlayer):
+
+    def __init__(self, token: str, network: TTTMLP = None, board_size: int = 9):
+        TTTPlayer.__init__(self, token)
+        self._network     = network if network is not None else TTTMLP(2 * board_size)
+        self._train       = False
+        self._epsilon     = 1.0
+        self._epsi_decay  = 0.9995
+        self._epsi_min    = 0.05
+        self._discount    = 0.95
+        self._player_num  = None
+
+    def _hashDigits(self, board_hashes: list):
+        '''
+        Returns (len(board_hashes), board size) array of board values
+        '''
+        joined = "".join(board_hashes).encode()
+        return (np.frombuffer(joined, dtype=np.uint8) - ord("0")).reshape(len(board_hashes), -1)
+
+    def _encode(self, digits: np.ndarray, player_num: int):
+        '''
+        Network input : player_num's tokens followed by opponent tokens
+        '''
+        own      = digits == player_num
+        opponent = (digits != 0) & ~own
+        return np.concatenate([own, opponent], axis=1).astype(float)
+
+    def _afterStates(self, board_hashes: list, moves: list):
+        '''
+        Returns board values after the agent plays moves[i] on board_hashes[i]
+        '''
+        digits = self._hashDigits(board_hashes)
+        digits[np.arange(len(moves)), moves] = self._player_num
+        return digits
+
+    def getNetwork(self):
+        '''
+        Returns the value network
+        '''
+        return self._network
+
+    def setEpsilon(self, epsilon: float):
+        '''
+        Set exploration rate
+        '''
+        self._epsilon = epsilon
+
+    def trainAgent(self, train: bool):
+        '''
+        Set memeber that denotes whether the model should be training or not
+        '''
+        self._train = train
+
+    def getValues(self, board_hashes: list, player_num: int):
+        '''
+        Evaluate many positions in a single batch
+        Positions are scored from the point of view of player_num (1 or 2)
+        '''
+        if player_num not in (1, 2):
+            raise ValueError("player_num must be 1 or 2, got {}".format(player_num))
+        return self._network.forward(self._encode(self._hashDigits(board_hashes), player_num))
+
+    def passReward(self, reward: float, state_actions: list):
+        '''
+        TD(0) update on every position the agent left during the game
+        Target for each after state is the discounted value of the next one,
+        the last after state is pulled towards the game reward
+        '''
+        if self._train:
+            hashes  = [state_action[0] for state_action in state_actions]
+            moves   = [state_action[1] for state_action in state_actions]
+            inputs  = self._encode(self._afterStates(hashes, moves), self._player_num)
+            values  = self._network.forward(inputs)
+            targets = np.append(self._discount * values[1:], reward)
+            self._network.train(inputs, targets)
+
+            # Decay exploration rate
+            if self._epsilon >= self._epsi_min:
+                self._epsilon *= self._epsi_decay
+
+    def getPolicyMove(self, board: TTTBoard):
+        '''
+        Scores every legal move in one batched forward pass and picks the best
+        '''
+        self._player_num = board._getPlayerNum(self._token)
+        moves  = board.getCurrentOpenPositions()
+        inputs = self._encode(self._afterStates([board.getHash()] * len(moves), moves), self._player_num)
+        return moves[int(np.argmax(self._network.forward(inputs)))]
+
+    def getMove(self, board: TTTBoard):
+        '''
+        Best move from getPolicyMove, explores randomly while training
+        '''
+        self._player_num = board._getPlayerNum(self._token)
+        if self._train and random.uniform(0, 1) < self._epsilon:
+            return self.getRandomMove(board)
+        return self.getPolicyMove(board)
+
+
+'''
+Agent that serves a compiled policy - see compilePolicy
+_policy[player_num - 1, state key] is the move to play, NO_MOVE if the
+compiled agent had no move for the state
+'''
+class TTTFrozenAgent(TTTPlayer):
+
+    NO_MOVE = 255
+
+    def __init__(self, token: str, policy: np.ndarray):
+        TTTPlayer.__init__(self, token)
+        self._policy = policy
+
+    @staticmethod
+    def load(token: str, path: str):
+        '''
+        Create agent from a policy written by save
+        '''
+        return TTTFrozenAgent(token, np.load(path))
+
+    def save(self, path: str):
+        '''
+        Write compiled policy to a .npy file
+        '''
+        np.save(path, self._policy)
+
+    def nbytes(self):
+        '''
+        Returns the size of the compiled policy in bytes
+        '''
+        return self._policy.nbytes
+
+    def passReward(self, reward: float, state_actions: list):
+        pass
+
+    def getPolicyMove(self, board: TTTBoard):
+        move = self._policy[board._getPlayerNum(self._token) - 1, board.getKey()]
+        if move == TTTFrozenAgent.NO_MOVE: return None
+        return int(move)
+
+    def getMove(self, board: TTTBoard):
+        move = self.getPolicyMove(board)
+        if move is None: return self.getRandomMove(board)
+        return move
+
+
+def _reachableStates(board: TTTBoard, player_num: int, first_player: int, states: set):
+    '''
+    Adds every non terminal state player_num has to move from, in games
+    where first_player moves first, to states
+    '''
+    tokens  = board.getPlayerTokens()
+    pending = [(board.getHash(), first_player)]
+    seen    = set()
+    while pending:
+        board_hash, mover = pending.pop()
+        if (board_hash, mover) in seen: continue
+        seen.add((board_hash, mover))
+        if mover == player_num: states.add(board_hash)
+        for move in TTTBoard.validMovesForHash(board_hash):
+            child = board_hash[:move] + str(mover) + board_hash[move + 1:]
+            board.setHash(child)
+            if board.checkForWinnerAt(move) is None and not board.isFull():
+                pending.append((child, 3 - mover))
+    board.reset()
+
+
+def compilePolicy(agent: TTTPlayer, rows: int = 3, cols: int = 3, win_length: int = 3):
+    '''
+    Ask agent for its move in every reachable state and store the moves in
+    a (2, 3 ^ board size) byte array indexed by [player_num - 1, state key]
+    Rows are the agent playing as player 1 and as player 2
+    Each row is compiled from a fresh copy of agent, so state an agent keeps
+    between moves (i.e. TTTMiniMaxAgent's move cache) can't leak from one
+    seat to the other, and agent itself is left untouched
+    Returns the array, to be served by TTTFrozenAgent
+    '''
+    size   = rows * cols
+    policy = np.full((2, 3 ** size), TTTFrozenAgent.NO_MOVE, dtype=np.uint8)
+    other  = agent.getToken() + "'"
+    for player_num in [1, 2]:
+        seat  = copy.deepcopy(agent)
+        board = TTTBoard(rows, cols, win_length)
+        for token in ([agent.getToken(), other] if player_num == 1 else [other, agent.getToken()]):
+            board.addPlayer(token)
+        states = set()
+        _reachableStates(board, player_num, 1, states)
+        _reachableStates(board, player_num, 2, states)
+        for board_hash in states:
+            board.setHash(board_hash)
+            move = seat.getPolicyMove(board)
+            if move is not None:
+                policy[player_num - 1, TTTBoard.keyForHash(board_hash)] = move
+        board.reset()
+    return policy
+
+
+def benchmarkValueNet(num_games: int = 20000, test_games: int = 200):
+    '''
+    Train a value network and a q table by self-play for the same number
+    of games, then compare memory, move speed and results
+    '''
+    network  = TTTMLP(18)
+    net_1    = TTTValueNetAgent("X", network)
+    net_2    = TTTValueNetAgent("O", network)
+    start    = time.time()
+    TicTacToe(net_1, net_2).train(num_games, train_p_1=True, train_p_2=True)
+    net_time = time.time() - start
+
+    q_1    = TTTQAgent("X")
+    q_2    = TTTQAgent("O")
+    start  = time.time()
+    TicTacToe(q_1, q_2).train(num_games, train_p_1=True, train_p_2=True)
+    q_time = time.time() - start
+    q_1.setEpsilon(0)
+
+    # positions met while playing a random agent
+    results = TicTacToe(net_1, TTTRandomAgent("O")).test(test_games)
+    boards  = [board for result in results for board in result["board_states"][:-1]]
+    hashes  = [board.getHash() for board in boards]
+    start   = time.time()
+    for board in boards: net_1.getMove(board)
+    net_moves = len(boards) / (time.time() - start)
+    start   = time.time()
+    for board in boards: q_1.getMove(board)
+    q_moves = len(boards) / (time.time() - start)
+    start   = time.time()
+    net_1.getValues(hashes, 1)
+    batch_evals = len(hashes) / (time.time() - start)
+
+    print("Games trained  : {}".format(num_games))
+    print("Train time     : net {:.1f}s, q table {:.1f}s".format(net_time, q_time))
+    q_memory = q_1.getMemoryUsage()
+    print("Memory         : net {}B, q table {}B ({} states)".format(
+        network.nbytes(), q_memory["bytes"], q_memory["states"]))
+    print("Moves/s        : net {:.0f}, q table {:.0f}".format(net_moves, q_moves))
+    print("Batched eval/s : net {:.0f}".format(batch_evals))
+
+    minimax = TTTMiniMaxAgent("O")
+    for name, agent in [("net", net_1), ("q table", q_1)]:
+        for opponent in [TTTRandomAgent("O"), minimax]:
+            results = TicTacToe(agent, opponent).test(test_games)
+            wins    = len([r for r in results if r["winner"] == agent.getToken()])
+            draws   = len([r for r in results if r["winner"] == "draw"])
+            print("{} vs {} : win {}%, draw {}%, loss {}%".format(
+                name, type(opponent).__name__, int(100 * wins / test_games),
+                int(100 * draws / test_games), int(100 * (test_games - wins - draws) / test_games)))
+    print()
+
+
+def benchmarkFrozen(agent: TTTPlayer, test_games: int = 200):
+    '''
+    Compile agent and compare the frozen agent against it :
+    compiled size, move latency, agreement on every compiled state with a
+    copy of agent that took no part in compiling, and results against a
+    random agent from both seats
+    '''
+    # copies taken before agent moves, one to time and one per seat to check
+    timed      = copy.deepcopy(agent)
+    references = [copy.deepcopy(agent) for _ in range(2)]
+    start  = time.time()
+    frozen = TTTFrozenAgent(agent.getToken(), compilePolicy(agent))
+    compile_time = time.time() - start
+
+    # positions met while playing a random agent, with a token agent can't have
+    other   = agent.getToken() + "'"
+    results = TicTacToe(frozen, TTTRandomAgent(other)).test(test_games)
+    boards  = [board for result in results for board in result["board_states"][:-1]]
+    outcomes = []
+    for seat_results in [results, TicTacToe(TTTRandomAgent(other), frozen).test(test_games)]:
+        winners = [result["winner"] for result in seat_results]
+        outcomes.append((winners.count(frozen.getToken()), winners.count("draw"), winners.count(other)))
+
+    start   = time.time()
+    for board in boards: timed.getPolicyMove(board)
+    agent_latency = (time.time() - start) / len(boards)
+    start   = time.time()
+    for board in boards: frozen.getMove(board)
+    frozen_latency = (time.time() - start) / len(boards)
+
+    compiled = 0
+    agree    = 0
+    for player_num in [1, 2]:
+        reference = references[player_num - 1]
+        board     = TTTBoard()
+        for token in ([agent.getToken(), other] if player_num == 1 else [other, agent.getToken()]):
+            board.addPlayer(token)
+        for key in np.nonzero(frozen._policy[player_num - 1] != TTTFrozenAgent.NO_MOVE)[0]:
+            board.setHash(np.base_repr(key, 3).zfill(board.size()))
+            compiled += 1
+            agree    += frozen.getMove(board) == reference.getPolicyMove(board)
+
+    print("Agent          : {}".format(type(agent).__name__))
+    print("Compile time   : {:.1f}s".format(compile_time))
+    print("Compiled size  : {}B ({} states with a move)".format(frozen.nbytes(), compiled))
+    print("Move latency   : agent {:.1f}us, frozen {:.1f}us".format(1e6 * agent_latency, 1e6 * frozen_latency))
+    print("Agreement      : {:.1f}%".format(100 * agree / max(compiled, 1)))
+    for name, (wins, draws, losses) in zip(["player 1", "player 2"], outcomes):
+        print("As {}    : win {}, draw {}, loss {} vs random".format(name, wins, draws, losses))
+    print()
+
+
 if __name__ == "__main__":
     player_1 = TTTQAgent("X")
     player_2 = TTTMiniMaxAgent("O")
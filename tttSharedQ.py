@@ -0,0 +1,231 @@
+from ticTacToe import TTTBoard
+from ticTacToe import TicTacToe
+from tttAgents import TTTQAgent
+from tttAgents import TTTRandomAgent
+from tttAgents import TTTMiniMaxAgent
+from multiprocessing import shared_memory
+import multiprocessing as mp
+import numpy as np
+import random
+import copy
+import time
+
+'''
+Dense Q table stored in shared memory
+Rows are integer state keys (see TTTBoard.keyForHash), columns are board positions
+Any number of processes can attach to the table by name and update it in place
+'''
+class TTTSharedQTable:
+
+    def __init__(self, board_size: int = 9, name: str = None):
+        '''
+        name : None creates a new table, otherwise attach to an existing table
+        '''
+        self._board_size = board_size
+        self._num_states = 3 ** board_size
+        self._owner      = name is None
+        shape  = (self._num_states, self._board_size)
+        nbytes = self._num_states * self._board_size * np.dtype(np.float64).itemsize
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._table = np.ndarray(shape, dtype=np.float64, buffer=self._shm.buf)
+        if self._owner:
+            # same initialization as TTTQAgent._addHash
+            self._table[:] = np.random.uniform(0, 1, shape)
+
+    def getName(self):
+        '''
+        Returns the name other processes use to attach to the table
+        '''
+        return self._shm.name
+
+    def getTable(self):
+        '''
+        Returns the shared state by action array
+        '''
+        return self._table
+
+    def nbytes(self):
+        '''
+        Returns the size of the table in bytes
+        '''
+        return self._table.nbytes
+
+    def close(self):
+        '''
+        Detach this process from the table
+        '''
+        self._table = None
+        self._shm.close()
+
+    def unlink(self):
+        '''
+        Free the shared memory block - call once, from the owner
+        '''
+        if self._owner: self._shm.unlink()
+
+
+'''
+Q Agent backed by a TTTSharedQTable
+Updates are written straight into shared memory without locking (Hogwild)
+Lost updates from racing writers are rare and tolerated
+'''
+class TTTSharedQAgent(TTTQAgent):
+
+    def __init__(self, token: str, table: TTTSharedQTable):
+        TTTQAgent.__init__(self, token)
+        self._shared  = table
+        self._q_table = table.getTable()
+        self._updates = 0
+
+    def _getMaxQMove(self, board: TTTBoard):
+        '''
+        Return move with the highest q value for given board state
+        '''
+        board_hash = board.getHash()
+        moves      = TTTBoard.validMovesForHash(board_hash)
+        q_values   = self._q_table[TTTBoard.keyForHash(board_hash), moves]
+        return moves[int(np.argmax(q_values))]
+
+    def _getMaxQFromHash(self, state_hash: str):
+        moves = TTTBoard.validMovesForHash(state_hash)
+        return self._q_table[TTTBoard.keyForHash(state_hash), moves].max()
+
+    def _addHash(self, board_hash: str, available_moves: list):
+        '''
+        Every state already has a row in the shared table
+        '''
+        pass
+
+    def _addReward(self, reward: float, action: int, state_hash: str):
+        '''
+        Add reward to state action's q value
+        '''
+        self._q_table[TTTBoard.keyForHash(state_hash), action] += reward
+
+    def _setQValue(self, new_value: float, action: int, state_hash: str):
+        '''
+        Set state action's q value to new value
+        '''
+        self._q_table[TTTBoard.keyForHash(state_hash), action] = new_value
+
+    def _updateQValue(self, curr_action: int, curr_state: str, next_state: str):
+        curr_key     = TTTBoard.keyForHash(curr_state)
+        curr_q_value = self._q_table[curr_key, curr_action]
+        new_value    = curr_q_value + ( self._alpha * ( (self._discount * self._getMaxQFromHash(next_state) ) - curr_q_value ) )
+        self._q_table[curr_key, curr_action] = new_value
+
+    def __deepcopy__(self, memo: dict):
+        '''
+        Copies read and update the same shared table rather than a copy of it
+        '''
+        agent = TTTSharedQAgent.__new__(TTTSharedQAgent)
+        memo[id(self)] = agent
+        for name, value in self.__dict__.items():
+            if name in ("_shared", "_q_table"): agent.__dict__[name] = value
+            else: agent.__dict__[name] = copy.deepcopy(value, memo)
+        return agent
+
+    def getPolicyMove(self, board: TTTBoard):
+        '''
+        Returns open move with the highest q value - every state has a row
+        '''
+        return self._getMaxQMove(board)
+
+    def getQTable(self):
+        '''
+        Returns a copy of the q table
+        '''
+        return self._q_table.copy()
+
+    def getMemoryUsage(self):
+        '''
+        Returns the shared table's size - every state always has a row
+        '''
+        return {
+            "states": self._q_table.shape[0],
+            "bytes" : self._q_table.nbytes,
+            "packed": True
+        }
+
+    def compactQTable(self, pack: bool = True, rows: int = None, cols: int = None, win_length: int = None):
+        '''
+        The shared table is dense and fixed in size, nothing to compact
+        '''
+        usage = self.getMemoryUsage()
+        return {
+            "states_before": usage["states"],
+            "states_after" : usage["states"],
+            "bytes_before" : usage["bytes"],
+            "bytes_after"  : usage["bytes"]
+        }
+
+    def getUpdateCount(self):
+        '''
+        Returns the number of q values updated by this agent
+        '''
+        return self._updates
+
+    def passReward(self, reward: float, state_actions: list):
+        if self._train: self._updates += len(state_actions)
+        TTTQAgent.passReward(self, reward, state_actions)
+
+
+def _trainWorker(table_name: str, num_games: int, seed: int):
+    '''
+    Attach to shared table and train against a random agent
+    Returns the number of q value updates made
+    '''
+    random.seed(seed)
+    table = TTTSharedQTable(name=table_name)
+    agent = TTTSharedQAgent("X", table)
+    game  = TicTacToe(agent, TTTRandomAgent("O"))
+    agent.trainAgent(True)
+    for _ in range(num_games):
+        game.playGame()
+    updates = agent.getUpdateCount()
+    # drop references into the shared buffer before detaching
+    agent = game = None
+    table.close()
+    return updates
+
+
+def benchmarkSharedQ(process_counts: list = [1, 2, 4], games_per_process: int = 5000, test_games: int = 100):
+    '''
+    Train a shared table with an increasing number of processes
+    Reports q update throughput and greedy results against TTTMiniMaxAgent
+    '''
+    # minimax opponent is reused so its move cache is only built once
+    minimax = TTTMiniMaxAgent("O")
+    for num_procs in process_counts:
+        table = TTTSharedQTable()
+        args  = [(table.getName(), games_per_process, seed) for seed in range(num_procs)]
+        start = time.time()
+        with mp.Pool(num_procs) as pool:
+            updates = sum(pool.starmap(_trainWorker, args))
+        elapsed = time.time() - start
+
+        agent = TTTSharedQAgent("X", table)
+        agent.setEpsilon(0)
+        results = TicTacToe(agent, minimax).test(test_games)
+        wins  = len([r for r in results if r["winner"] == agent.getToken()])
+        draws = len([r for r in results if r["winner"] == "draw"])
+
+        print("Processes : {}".format(num_procs))
+        print("Games     : {}".format(num_procs * games_per_process))
+        print("Time      : {:.2f}s".format(elapsed))
+        print("Updates/s : {:.0f}".format(updates / elapsed))
+        print("Win       : {}%".format(int(100 * wins / test_games)))
+        print("Draw      : {}%".format(int(100 * draws / test_games)))
+        print("Loss      : {}%".format(int(100 * (test_games - wins - draws) / test_games)))
+        print()
+
+        agent = None
+        table.close()
+        table.unlink()
+
+
+if __name__ == "__main__":
+    benchmarkSharedQ()
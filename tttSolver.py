@@ -0,0 +1,252 @@
+from ticTacToe import TTTBoard
+import time
+import math
+
+'''
+Depth first proof number (df-pn) solver for K in a row boards
+Proves or disproves that the side to move (the attacker) can force a win
+- OR nodes  : attacker to move, proven if any child is proven
+- AND nodes : defender to move, proven if every child is proven
+Draws and defender wins both count as disproofs
+Moves are made and undone on a TTTBoard, positions are stored in a
+transposition table keyed by the base 3 state key
+'''
+class TTTProofNumberSolver:
+
+    INF = math.inf
+
+    def __init__(self, max_entries: int = 1000000, gc_keep: float = 0.5):
+        '''
+        max_entries : transposition table size that triggers garbage collection
+        gc_keep     : fraction of entries kept by garbage collection, the
+                      entries with the most search work behind them are kept
+        '''
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1, got {}".format(max_entries))
+        if not 0 < gc_keep <= 1:
+            raise ValueError("gc_keep must be in (0, 1], got {}".format(gc_keep))
+        self._max_entries = max_entries
+        self._gc_keep     = gc_keep
+        self._table       = {
+            # state key : (proof number, disproof number, work)
+        }
+        self._problem   = None
+        self._nodes     = 0
+        self._max_nodes = 0
+        self._gc_runs   = 0
+
+    def _store(self, key: int, proof: float, disproof: float, work: int):
+        '''
+        Add entry to transposition table, garbage collect if it is full
+        '''
+        self._table[key] = (proof, disproof, work)
+        if len(self._table) > self._max_entries:
+            self._collectGarbage()
+
+    def _collectGarbage(self):
+        '''
+        Drop the entries with the least work - cheapest to search again
+        Keeps the gc_keep fraction of entries with the most work
+        '''
+        keep    = int(len(self._table) * self._gc_keep)
+        entries = sorted(self._table.items(), key=lambda item: item[1][2], reverse=True)
+        self._table = dict(entries[:keep])
+        self._gc_runs += 1
+
+    def _terminalValue(self, move: int, or_node: bool):
+        '''
+        Value of the child after move is placed, None if the game continues
+        Mover is the attacker at OR nodes, the defender at AND nodes
+        '''
+        if self._board.checkForWinnerAt(move) is not None:
+            return (0, self.INF) if or_node else (self.INF, 0)
+        if self._board.isFull():
+            return (self.INF, 0)
+        return None
+
+    def _children(self, key: int, or_node: bool):
+        '''
+        Returns list of (move, child key, terminal value or None)
+        '''
+        token    = self._attacker if or_node else self._defender
+        place    = self._attacker_num if or_node else self._defender_num
+        children = []
+        for move in self._board.getCurrentOpenPositions():
+            self._board.placeToken(move, token)
+            children.append((move, key + place * self._place_vals[move], self._terminalValue(move, or_node)))
+            self._board.clearPosition(move)
+        return children
+
+    def _childValue(self, child: tuple):
+        '''
+        Returns (proof, disproof) of a child, unseen children start at (1, 1)
+        '''
+        if child[2] is not None: return child[2]
+        entry = self._table.get(child[1])
+        if entry is None: return (1, 1)
+        return (entry[0], entry[1])
+
+    def _mid(self, key: int, or_node: bool, th_proof: float, th_disproof: float):
+        '''
+        Multiple iterative deepening : search below key until its proof number
+        reaches th_proof or its disproof number reaches th_disproof
+        Returns the number of nodes expanded
+        '''
+        self._nodes += 1
+        work     = 1
+        children = self._children(key, or_node)
+        token    = self._attacker if or_node else self._defender
+        while True:
+            values = [self._childValue(child) for child in children]
+            if or_node:
+                # OR : proof = min child proof, disproof = sum child disproofs
+                proof    = min(value[0] for value in values)
+                disproof = sum(value[1] for value in values)
+                select   = [value[0] for value in values]
+            else:
+                # AND : proof = sum child proofs, disproof = min child disproof
+                proof    = sum(value[0] for value in values)
+                disproof = min(value[1] for value in values)
+                select   = [value[1] for value in values]
+            if proof >= th_proof or disproof >= th_disproof or self._nodes >= self._max_nodes:
+                break
+
+            best   = min(range(len(children)), key=lambda i: select[i])
+            second = min([select[i] for i in range(len(children)) if i != best], default=self.INF)
+            if or_node:
+                child_th_proof    = min(th_proof, second + 1)
+                child_th_disproof = th_disproof - disproof + values[best][1]
+            else:
+                child_th_proof    = th_proof - proof + values[best][0]
+                child_th_disproof = min(th_disproof, second + 1)
+
+            move = children[best][0]
+            self._board.placeToken(move, token)
+            work += self._mid(children[best][1], not or_node, child_th_proof, child_th_disproof)
+            self._board.clearPosition(move)
+
+        previous = self._table.get(key)
+        total    = work + previous[2] if previous is not None else work
+        self._store(key, proof, disproof, total)
+        return work
+
+    def _treeSize(self, key: int, or_node: bool, proven: bool, seen: set):
+        '''
+        Count distinct positions in the proof (or disproof) tree below key
+        Entries lost to garbage collection are counted as leaves, so the
+        result is a lower bound if any collection happened
+        '''
+        if key in seen: return 0
+        seen.add(key)
+        size     = 1
+        token    = self._attacker if or_node else self._defender
+        # proof : one child at OR nodes, all at AND - disproof is the reverse
+        one_only = or_node == proven
+        index    = 0 if proven else 1
+        for child in self._children(key, or_node):
+            value = self._childValue(child)
+            if value[index] != 0:
+                if one_only: continue
+                # missing from the table, can't follow it
+                size += 1
+                continue
+            if child[2] is not None:
+                size += 1
+            else:
+                self._board.placeToken(child[0], token)
+                size += self._treeSize(child[1], not or_node, proven, seen)
+                self._board.clearPosition(child[0])
+            if one_only: break
+        return size
+
+    def clear(self):
+        '''
+        Empty the transposition table
+        '''
+        self._table.clear()
+
+    def solve(self, board: TTTBoard, token: str, max_nodes: int = 1000000):
+        '''
+        Try to prove that token, moving next on board, can force a win
+        Stops after max_nodes node expansions
+        The transposition table is reused between calls with the same token,
+        board dimensions and piece count parity - which decides whether a
+        stored position is an OR or an AND node - so a search can be
+        continued with a new budget
+        Returns {
+            "result"      : "win", "no win" or "unknown",
+            "proof"       : root proof number,
+            "disproof"    : root disproof number,
+            "nodes"       : nodes expanded,
+            "time"        : seconds,
+            "nodes_per_s" : nodes expanded per second,
+            "proof_size"  : positions in the proof / disproof tree, None if unknown,
+            "tt_entries"  : transposition table size,
+            "gc_runs"     : number of garbage collections
+        }
+        '''
+        parity = (board.size() - len(board.getCurrentOpenPositions())) % 2
+        if self._problem != (token, board.getDimensions(), parity):
+            self.clear()
+            self._problem = (token, board.getDimensions(), parity)
+        self._board        = board.copy()
+        self._attacker     = token
+        self._defender     = [t for t in board.getPlayerTokens() if t != token][0]
+        self._attacker_num = self._board._getPlayerNum(self._attacker)
+        self._defender_num = self._board._getPlayerNum(self._defender)
+        self._place_vals   = [3 ** (board.size() - 1 - pos) for pos in range(board.size())]
+        self._nodes        = 0
+        self._max_nodes    = max_nodes
+        self._gc_runs      = 0
+
+        start = time.time()
+        winner = self._board.checkForWinner()
+        if winner is not None or self._board.isFull():
+            proof, disproof = (0, self.INF) if winner == token else (self.INF, 0)
+        else:
+            key = self._board.getKey()
+            self._mid(key, True, self.INF, self.INF)
+            proof, disproof = self._table[key][:2]
+        elapsed = time.time() - start
+
+        result     = "unknown"
+        proof_size = None
+        if proof == 0 or disproof == 0:
+            result     = "win" if proof == 0 else "no win"
+            proof_size = 1
+            if self._board.checkForWinner() is None and not self._board.isFull():
+                proof_size = self._treeSize(self._board.getKey(), True, proof == 0, set())
+
+        return {
+            "result"     : result,
+            "proof"      : proof,
+            "disproof"   : disproof,
+            "nodes"      : self._nodes,
+            "time"       : elapsed,
+            "nodes_per_s": self._nodes / elapsed if elapsed else 0,
+            "proof_size" : proof_size,
+            "tt_entries" : len(self._table),
+            "gc_runs"    : self._gc_runs
+        }
+
+
+def benchmarkSolver(max_nodes: int = 2000000, max_entries: int = 500000):
+    '''
+    Solve the empty board of several K in a row variants for the first player
+    '''
+    for rows, cols, win_length in [(3, 3, 3), (4, 4, 3), (4, 4, 4), (5, 5, 4)]:
+        board = TTTBoard(rows, cols, win_length)
+        board.addPlayer("X")
+        board.addPlayer("O")
+        results = TTTProofNumberSolver(max_entries=max_entries).solve(board, "X", max_nodes=max_nodes)
+        print("{}x{} {} in a row".format(rows, cols, win_length))
+        print("Result     : {}".format(results["result"]))
+        print("Nodes      : {} ({:.0f}/s)".format(results["nodes"], results["nodes_per_s"]))
+        print("Time       : {:.1f}s".format(results["time"]))
+        print("Proof size : {}".format(results["proof_size"]))
+        print("TT entries : {} ({} gc runs)".format(results["tt_entries"], results["gc_runs"]))
+        print()
+
+
+if __name__ == "__main__":
+    benchmarkSolver()
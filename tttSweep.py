@@ -0,0 +1,244 @@
+from ticTacToe import TTTBoard
+from ticTacToe import TicTacToe
+from tttAgents import TTTQAgent
+from tttAgents import TTTRandomAgent
+from tttAgents import TTTFrozenAgent
+import numpy as np
+import itertools
+import time
+
+'''
+Train many TTTQAgent style learners at once for hyperparameter sweeps
+Every agent's q table is a slice of one (agents, 3 ^ 9, 9) array, indexed
+by state key, and every agent plays its own batch of games against an
+opponent. All games advance one move per step with numpy operations
+The agent is always player 1, who moves first is random - as in TicTacToe
+Updates follow TTTQAgent.passReward, one game after another for each agent
+'''
+class TTTQSweep:
+
+    def __init__(self, alphas: list, discounts: list, epsi_decays: list, epsi_mins: list,
+                 games_per_agent: int = 1, opponent_policy: np.ndarray = None):
+        '''
+        alphas, discounts, epsi_decays, epsi_mins : one value per agent
+        games_per_agent : games each agent plays at the same time
+        opponent_policy : policy from compilePolicy played by the opponent,
+                          None for a random opponent
+        '''
+        self._alpha      = np.asarray(alphas, dtype=float)
+        self._discount   = np.asarray(discounts, dtype=float)
+        self._epsi_decay = np.asarray(epsi_decays, dtype=float)
+        self._epsi_min   = np.asarray(epsi_mins, dtype=float)
+        self._epsilon    = np.ones(self._alpha.shape[0])
+        self._num_agents = self._alpha.shape[0]
+        self._batch      = games_per_agent
+        self._opponent   = opponent_policy
+
+        board             = TTTBoard()
+        self._size        = board.size()
+        self._num_states  = 3 ** self._size
+        self._lines       = np.array(board.getWinningLines())
+        self._place_vals  = 3 ** np.arange(self._size - 1, -1, -1, dtype=np.int64)
+        # open positions of every state key
+        digits = (np.arange(self._num_states)[:, None] // self._place_vals) % 3
+        self._open = digits == 0
+
+        # same initialization as TTTQAgent._addHash
+        self._q_tables = np.random.uniform(0, 1, (self._num_agents, self._num_states, self._size))
+        self._visited  = np.zeros((self._num_agents, self._num_states), dtype=bool)
+
+    @staticmethod
+    def grid(**values):
+        '''
+        Every combination of the given hyperparameter values
+        i.e. grid(alphas=[0.1, 0.5], discounts=[0.9, 0.95], ...)
+        Returns dict of lists to pass to TTTQSweep
+        '''
+        names  = list(values.keys())
+        points = list(itertools.product(*[values[name] for name in names]))
+        return {name: [point[i] for point in points] for i, name in enumerate(names)}
+
+    def _maxOpenQ(self, agents: np.ndarray, keys: np.ndarray):
+        '''
+        Highest q value over the open positions of each state
+        '''
+        return np.where(self._open[keys], self._q_tables[agents, keys], -np.inf).max(axis=1)
+
+    def _passReward(self, games: np.ndarray, agents: np.ndarray, rewards: np.ndarray,
+                    traj_keys: np.ndarray, traj_moves: np.ndarray, traj_len: np.ndarray):
+        '''
+        passReward for finished games of different agents : last move's q
+        value set to the reward, then each earlier move updated from the one
+        after it
+        '''
+        lengths = traj_len[games]
+        last    = lengths - 1
+        self._q_tables[agents, traj_keys[games, last], traj_moves[games, last]] = rewards
+        for move in range(lengths.max() - 2, -1, -1):
+            sel   = lengths - 2 >= move
+            g     = games[sel]
+            a     = agents[sel]
+            keys  = traj_keys[g, move]
+            moves = traj_moves[g, move]
+            curr  = self._q_tables[a, keys, moves]
+            self._q_tables[a, keys, moves] = curr + self._alpha[a] * (
+                self._discount[a] * self._maxOpenQ(a, traj_keys[g, move + 1]) - curr)
+
+    def _update(self, games: np.ndarray, agents: np.ndarray, rewards: np.ndarray,
+                traj_keys: np.ndarray, traj_moves: np.ndarray, traj_len: np.ndarray):
+        '''
+        passReward for a set of finished games
+        Games of the same agent can share a (state, move) and numpy fancy
+        indexing would keep only one of their writes, so the games are split
+        into rounds holding at most one game per agent and the rounds are
+        applied in order - the same result as sequential passReward calls
+        '''
+        order = np.argsort(agents, kind="stable")
+        first = np.searchsorted(agents[order], agents[order])
+        rank  = np.empty(agents.shape[0], dtype=np.int64)
+        rank[order] = np.arange(agents.shape[0]) - first
+        for r in range(rank.max() + 1):
+            sel = rank == r
+            self._passReward(games[sel], agents[sel], rewards[sel], traj_keys, traj_moves, traj_len)
+
+        # Decay exploration rate once per finished game
+        finished = np.bincount(agents, minlength=self._num_agents)
+        for i in range(finished.max()):
+            decay = (finished > i) & (self._epsilon >= self._epsi_min)
+            self._epsilon[decay] *= self._epsi_decay[decay]
+
+    def train(self, num_games: int, report_every: int = 1000):
+        '''
+        Every agent plays num_games training games
+        Generator - every report_every games per agent yields {
+            "games" : games played by each agent so far,
+            "win"   : (agents,) win rate over the last report_every games,
+            "draw"  : (agents,) draw rate,
+            "loss"  : (agents,) loss rate
+        }
+        '''
+        num_slots  = self._num_agents * self._batch
+        agent_of   = np.repeat(np.arange(self._num_agents), self._batch)
+        boards     = np.zeros((num_slots, self._size), dtype=np.int8)
+        turn       = np.random.randint(1, 3, num_slots).astype(np.int8)
+        traj_keys  = np.zeros((num_slots, self._size // 2 + 1), dtype=np.int64)
+        traj_moves = np.zeros((num_slots, self._size // 2 + 1), dtype=np.int64)
+        traj_len   = np.zeros(num_slots, dtype=np.int64)
+        active     = np.tile(np.arange(self._batch) < num_games, self._num_agents)
+        started    = np.full(self._num_agents, min(self._batch, num_games))
+        finished   = np.zeros(self._num_agents, dtype=np.int64)
+        results    = np.zeros((self._num_agents, num_games), dtype=np.int8)
+        reported   = 0
+
+        while active.any():
+            keys  = boards.astype(np.int64) @ self._place_vals
+            moves = np.zeros(num_slots, dtype=np.int64)
+            # random open position for every game
+            scores = np.random.uniform(0, 1, (num_slots, self._size))
+            scores[boards != 0] = -1
+            moves[:] = scores.argmax(axis=1)
+
+            # agent moves : greedy unless exploring
+            agent_turn = np.nonzero(active & (turn == 1))[0]
+            a          = agent_of[agent_turn]
+            greedy     = np.random.uniform(0, 1, agent_turn.shape[0]) > self._epsilon[a]
+            q_values   = np.where(boards[agent_turn] == 0, self._q_tables[a, keys[agent_turn]], -np.inf)
+            moves[agent_turn] = np.where(greedy, q_values.argmax(axis=1), moves[agent_turn])
+            traj_keys[agent_turn, traj_len[agent_turn]]  = keys[agent_turn]
+            traj_moves[agent_turn, traj_len[agent_turn]] = moves[agent_turn]
+            traj_len[agent_turn] += 1
+            self._visited[a, keys[agent_turn]] = True
+
+            # opponent moves
+            if self._opponent is not None:
+                opp_turn = np.nonzero(active & (turn == 2))[0]
+                policy   = self._opponent[1, keys[opp_turn]]
+                known    = policy != TTTFrozenAgent.NO_MOVE
+                moves[opp_turn[known]] = policy[known]
+
+            playing = np.nonzero(active)[0]
+            boards[playing, moves[playing]] = turn[playing]
+            won  = (boards[playing][:, self._lines] == turn[playing][:, None, None]).all(axis=2).any(axis=1)
+            full = (boards[playing] != 0).all(axis=1)
+            done = won | full
+
+            ended = playing[done]
+            if ended.shape[0]:
+                rewards = np.where(won[done], np.where(turn[ended] == 1, 1, -1), 0)
+                self._update(ended, agent_of[ended], rewards, traj_keys, traj_moves, traj_len)
+                for game, reward in zip(ended, rewards):
+                    agent = agent_of[game]
+                    results[agent, finished[agent]] = reward
+                    finished[agent] += 1
+                    if started[agent] < num_games:
+                        started[agent] += 1
+                    else:
+                        active[game] = False
+                boards[ended]   = 0
+                traj_len[ended] = 0
+                turn[ended]     = np.random.randint(1, 3, ended.shape[0])
+
+            turn[playing[~done]] = 3 - turn[playing[~done]]
+
+            # stream learning curves once every agent has reached the next report
+            while finished.min() >= reported + report_every:
+                window   = results[:, reported:reported + report_every]
+                reported += report_every
+                yield {
+                    "games": reported,
+                    "win"  : (window == 1).mean(axis=1),
+                    "draw" : (window == 0).mean(axis=1),
+                    "loss" : (window == -1).mean(axis=1)
+                }
+
+    def getAgent(self, index: int, token: str = "X"):
+        '''
+        Returns a TTTQAgent holding the states agent index has visited
+        '''
+        agent = TTTQAgent(token)
+        agent.setHyperparameters(self._alpha[index], self._discount[index], self._epsi_decay[index], self._epsi_min[index])
+        agent.setEpsilon(self._epsilon[index])
+        q_table = { }
+        for key in np.nonzero(self._visited[index])[0]:
+            board_hash = np.base_repr(key, 3).zfill(self._size)
+            q_table[board_hash] = {
+                move: float(self._q_tables[index, key, move]) for move in TTTBoard.validMovesForHash(board_hash)
+            }
+        agent.setQTable(q_table)
+        return agent
+
+
+def benchmarkSweep(num_games: int = 50000, report_every: int = 5000, games_per_agent: int = 4, sequential_runs: int = 2):
+    '''
+    64 point sweep over alpha, discount, epsilon decay and epsilon minimum
+    against a random opponent, timed against sequential TicTacToe.train runs
+    Sequential time is measured on sequential_runs runs and scaled to 64
+    '''
+    points = TTTQSweep.grid(alphas=[0.1, 0.3, 0.5, 0.9], discounts=[0.8, 0.9, 0.95, 0.99],
+                            epsi_decays=[0.999, 0.9999], epsi_mins=[0.005, 0.05])
+    sweep  = TTTQSweep(**points, games_per_agent=games_per_agent)
+    start  = time.time()
+    for curve in sweep.train(num_games, report_every):
+        best = int(curve["win"].argmax())
+        print("Games {:>6} : mean win {:.1f}%, best win {:.1f}% (agent {}), mean loss {:.1f}%".format(
+            curve["games"], 100 * curve["win"].mean(), 100 * curve["win"][best], best, 100 * curve["loss"].mean()))
+    sweep_time = time.time() - start
+
+    start = time.time()
+    for run in range(sequential_runs):
+        agent = TTTQAgent("X")
+        agent.setHyperparameters(points["alphas"][run], points["discounts"][run],
+                                 points["epsi_decays"][run], points["epsi_mins"][run])
+        TicTacToe(agent, TTTRandomAgent("O")).train(num_games, train_p_1=True)
+    sequential_time = (time.time() - start) / sequential_runs * len(points["alphas"])
+
+    print("Agents          : {}".format(len(points["alphas"])))
+    print("Games per agent : {}".format(num_games))
+    print("Sweep time      : {:.1f}s".format(sweep_time))
+    print("Sequential time : {:.1f}s (estimated from {} runs)".format(sequential_time, sequential_runs))
+    print("Speedup         : {:.1f}x".format(sequential_time / sweep_time))
+    print()
+
+
+if __name__ == "__main__":
+    benchmarkSweep()
@@ -0,0 +1,299 @@
+from ticTacToe import TTTPlayer
+from ticTacToe import TTTBoard
+from ticTacToe import TicTacToe
+from tttAgents import TTTRandomAgent
+import numpy as np
+import random
+import time
+import json
+import os
+
+'''
+Solved game values for every state of a K in a row board, 2 bits per state
+State keys are the base 3 board hashes (see TTTBoard.keyForHash)
+Values are from the perspective of the side to move, assuming player 1 moves first
+    0 : invalid / unreachable state
+    1 : loss
+    2 : draw
+    3 : win
+The packed array lives in a file and is served through a read only memory map
+A second file (path + ".moves") holds one byte per state key : the best move
+for the side to move, NO_MOVE for invalid and finished states
+The board dimensions are written next to them (path + ".json") and checked on open
+'''
+class TTTTablebase:
+
+    INVALID = 0
+    LOSS    = 1
+    DRAW    = 2
+    WIN     = 3
+    NO_MOVE = 255
+
+    def __init__(self, path: str, rows: int = 4, cols: int = 4, win_length: int = 4):
+        '''
+        Open a tablebase written by TTTTablebase.build
+        Raises ValueError if the files weren't built for this board
+        '''
+        self._rows       = rows
+        self._cols       = cols
+        self._win_length = win_length
+        self._num_states = 3 ** (rows * cols)
+        if not os.path.exists(path + ".json"):
+            raise ValueError("Tablebase file {} has no board dimensions ({}.json)".format(path, path))
+        with open(path + ".json") as f:
+            info = json.load(f)
+        if (info["rows"], info["cols"], info["win_length"]) != (rows, cols, win_length):
+            raise ValueError("Tablebase file {} is for a {}x{} {} in a row board, not {}x{} {} in a row".format(
+                path, info["rows"], info["cols"], info["win_length"], rows, cols, win_length))
+        nbytes = TTTTablebase._packedSize(self._num_states)
+        if os.path.getsize(path) != nbytes:
+            raise ValueError("Tablebase file {} does not match a {}x{} board".format(path, rows, cols))
+        self._table = np.memmap(path, dtype=np.uint8, mode="r", shape=(nbytes,))
+        self._moves = None
+        if os.path.exists(path + ".moves"):
+            if os.path.getsize(path + ".moves") != self._num_states:
+                raise ValueError("Move file {}.moves does not match a {}x{} board".format(path, rows, cols))
+            self._moves = np.memmap(path + ".moves", dtype=np.uint8, mode="r", shape=(self._num_states,))
+
+    @staticmethod
+    def _packedSize(num_states: int):
+        '''
+        Returns the number of bytes needed to store num_states 2 bit values
+        '''
+        return (num_states + 3) // 4
+
+    @staticmethod
+    def _readPacked(table: np.ndarray, keys: np.ndarray):
+        '''
+        Returns the 2 bit values stored at each key
+        '''
+        return (table[keys >> 2] >> ((keys & 3) << 1)) & 3
+
+    @staticmethod
+    def _solveChunk(table: np.ndarray, start: int, end: int, size: int, lines: np.ndarray):
+        '''
+        Returns the values and best moves for keys start to end - 1
+        Every key above end must already be solved and written to table
+        A move always increases the state key, so children are either
+        later in this chunk or already in the table
+        '''
+        keys   = np.arange(start, end, dtype=np.int64)
+        digits = np.empty((keys.shape[0], size), dtype=np.int8)
+        rem    = keys.copy()
+        for pos in range(size - 1, -1, -1):
+            rem, digits[:, pos] = np.divmod(rem, 3)
+
+        count_1 = (digits == 1).sum(axis=1)
+        count_2 = (digits == 2).sum(axis=1)
+        pieces  = count_1 + count_2
+        legal   = (count_1 == count_2) | (count_1 == count_2 + 1)
+        mover   = np.where(count_1 == count_2, 1, 2).astype(np.int64)
+
+        line_vals  = digits[:, lines]
+        won_1      = (line_vals == 1).all(axis=2).any(axis=1)
+        won_2      = (line_vals == 2).all(axis=2).any(axis=1)
+        mover_won  = np.where(mover == 1, won_1, won_2)
+        last_won   = np.where(mover == 1, won_2, won_1)
+        line_vals  = None
+
+        values = np.zeros(keys.shape[0], dtype=np.uint8)
+        moves  = np.full(keys.shape[0], TTTTablebase.NO_MOVE, dtype=np.uint8)
+        # the side to move can't already have a line in a real game
+        values[legal & last_won & ~mover_won] = TTTTablebase.LOSS
+        open_states = legal & ~last_won & ~mover_won
+        values[open_states & (pieces == size)] = TTTTablebase.DRAW
+
+        place_vals = 3 ** np.arange(size - 1, -1, -1, dtype=np.int64)
+        # solve fullest positions first so children in this chunk are ready
+        for num_pieces in range(size - 1, -1, -1):
+            idx = np.nonzero(open_states & (pieces == num_pieces))[0]
+            if not idx.shape[0]: continue
+            sub_digits = digits[idx]
+            sub_mover  = mover[idx]
+            sub_keys   = keys[idx]
+            # 3 : a child the opponent loses, 2 : a drawn child, 1 : any move
+            rank       = np.zeros(idx.shape[0], dtype=np.int8)
+            best       = np.zeros(idx.shape[0], dtype=np.uint8)
+            for pos in range(size):
+                empty = np.nonzero(sub_digits[:, pos] == 0)[0]
+                child = sub_keys[empty] + sub_mover[empty] * place_vals[pos]
+                local = child < end
+                child_vals = np.empty(child.shape[0], dtype=np.uint8)
+                child_vals[local]  = values[child[local] - start]
+                child_vals[~local] = TTTTablebase._readPacked(table, child[~local])
+                child_rank = np.where(child_vals == TTTTablebase.LOSS, 3, np.where(child_vals == TTTTablebase.DRAW, 2, 1))
+                better     = child_rank > rank[empty]
+                rank[empty[better]] = child_rank[better]
+                best[empty[better]] = pos
+            values[idx] = np.where(rank == 3, TTTTablebase.WIN, np.where(rank == 2, TTTTablebase.DRAW, TTTTablebase.LOSS))
+            moves[idx]  = best
+        return values, moves
+
+    @staticmethod
+    def build(path: str, rows: int = 4, cols: int = 4, win_length: int = 4, chunk_size: int = 2 ** 20, verbose: bool = False):
+        '''
+        Solve every state of the board and write the packed values to path
+        States are solved in chunks from the highest key down, so working
+        memory is bounded by chunk_size regardless of board size
+        The value file is 3 ^ (rows * cols) / 4 bytes : ~10MB for 4x4
+        The move file is 3 ^ (rows * cols) bytes : ~41MB for 4x4
+        '''
+        size       = rows * cols
+        num_states = 3 ** size
+        nbytes     = TTTTablebase._packedSize(num_states)
+        chunk_size = max(4, chunk_size - chunk_size % 4)
+        lines      = np.array(TTTBoard(rows, cols, win_length).getWinningLines(), dtype=np.int64)
+        table      = np.memmap(path, dtype=np.uint8, mode="w+", shape=(nbytes,))
+        best_moves = np.memmap(path + ".moves", dtype=np.uint8, mode="w+", shape=(num_states,))
+
+        start_time = time.time()
+        starts     = list(range(0, num_states, chunk_size))
+        for chunk, start in enumerate(reversed(starts)):
+            end    = min(start + chunk_size, num_states)
+            values, moves = TTTTablebase._solveChunk(table, start, end, size, lines)
+            best_moves[start:end] = moves
+            # pad to a whole number of bytes and pack 4 values per byte
+            padded = np.zeros(4 * TTTTablebase._packedSize(values.shape[0]), dtype=np.uint8)
+            padded[:values.shape[0]] = values
+            padded = padded.reshape(-1, 4)
+            packed = padded[:, 0] | (padded[:, 1] << 2) | (padded[:, 2] << 4) | (padded[:, 3] << 6)
+            table[start // 4:start // 4 + packed.shape[0]] = packed
+            if verbose:
+                print("Chunk {}/{} - {:.1f}s".format(chunk + 1, len(starts), time.time() - start_time))
+        table.flush()
+        best_moves.flush()
+        table = best_moves = None
+        with open(path + ".json", "w") as f:
+            json.dump({"rows": rows, "cols": cols, "win_length": win_length}, f)
+        return TTTTablebase(path, rows, cols, win_length)
+
+    def _keyForMover(self, board_hash: str, player_num: int):
+        '''
+        Returns the key of the state as stored in the table
+        The table assumes player 1 moves first, if player_num is to move
+        under the other order the players are swapped
+        '''
+        count_1 = board_hash.count("1")
+        count_2 = board_hash.count("2")
+        if (player_num == 1 and count_1 == count_2) or (player_num == 2 and count_1 == count_2 + 1):
+            return TTTBoard.keyForHash(board_hash)
+        return TTTBoard.keyForHash(board_hash.translate(str.maketrans("12", "21")))
+
+    def nbytes(self):
+        '''
+        Returns the size of the packed table in bytes
+        '''
+        return self._table.shape[0]
+
+    def hasMoves(self):
+        '''
+        Returns whether the best move file was found
+        '''
+        return self._moves is not None
+
+    def lookup(self, key: int):
+        '''
+        Returns the raw 2 bit value stored for a state key
+        '''
+        return int((self._table[key >> 2] >> ((key & 3) << 1)) & 3)
+
+    def getValue(self, board: TTTBoard, token: str):
+        '''
+        Returns the value of the board for the player with token to move
+        1 : win, 0 : draw, -1 : loss, None if the state is unreachable
+        '''
+        value = self.lookup(self._keyForMover(board.getHash(), board._getPlayerNum(token)))
+        if value == TTTTablebase.INVALID: return None
+        return value - TTTTablebase.DRAW
+
+    def getBestMove(self, board: TTTBoard, token: str):
+        '''
+        Returns the best move for the player with token to move with a
+        single read of the move file, None if there is no move to play
+        '''
+        move = self._moves[self._keyForMover(board.getHash(), board._getPlayerNum(token))]
+        if move == TTTTablebase.NO_MOVE: return None
+        return int(move)
+
+
+'''
+Perfect player that reads every move from a TTTTablebase
+One read of the move file per position, or one value read per legal
+move if the tablebase was opened without its move file
+'''
+class TTTTablebaseAgent(TTTPlayer):
+
+    def __init__(self, token: str, tablebase: TTTTablebase):
+        TTTPlayer.__init__(self, token)
+        self._tablebase = tablebase
+
+    def _getOpponentToken(self, board: TTTBoard):
+        '''
+        Returns the token of opponent from board
+        '''
+        for token in board.getPlayerTokens():
+            if token != self.getToken():
+                return token
+
+    def passReward(self, reward: float, state_actions: list):
+        pass
+
+    def getMove(self, board: TTTBoard):
+        '''
+        Pick the move that leaves the opponent with the worst value
+        Ties are broken randomly when reading values
+        '''
+        if self._tablebase.hasMoves():
+            move = self._tablebase.getBestMove(board, self.getToken())
+            if move is not None: return move
+        opponent   = self._getOpponentToken(board)
+        best_value = None
+        best_moves = []
+        for move in board.getCurrentOpenPositions():
+            board.placeToken(move, self.getToken())
+            value = self._tablebase.getValue(board, opponent)
+            board.clearPosition(move)
+            if best_value is None or value < best_value:
+                best_value = value
+                best_moves = [move]
+            elif value == best_value:
+                best_moves.append(move)
+        return random.choice(best_moves)
+
+
+def benchmarkTablebase(path: str = "ttt_4x4.tb", rows: int = 4, cols: int = 4, win_length: int = 4, test_games: int = 100):
+    '''
+    Build the tablebase if needed, then report its size, lookup speed and
+    results against a random agent
+    '''
+    if not os.path.exists(path):
+        start = time.time()
+        tablebase = TTTTablebase.build(path, rows, cols, win_length, verbose=True)
+        print("Build     : {:.1f}s".format(time.time() - start))
+    else:
+        tablebase = TTTTablebase(path, rows, cols, win_length)
+
+    board = TTTBoard(rows, cols, win_length)
+    board.addPlayer("X")
+    board.addPlayer("O")
+    print("Size      : {:.1f}MB values, {:.1f}MB moves".format(tablebase.nbytes() / 2 ** 20, 3 ** (rows * cols) / 2 ** 20))
+    print("Empty     : {}".format(tablebase.getValue(board, "X")))
+
+    keys  = np.random.randint(0, 3 ** (rows * cols), size=100000)
+    start = time.time()
+    for key in keys:
+        tablebase.lookup(int(key))
+    print("Lookup    : {:.2f}us".format(1e6 * (time.time() - start) / keys.shape[0]))
+
+    agent   = TTTTablebaseAgent("X", tablebase)
+    results = TicTacToe(agent, TTTRandomAgent("O"), rows=rows, cols=cols, win_length=win_length).test(test_games)
+    wins    = len([r for r in results if r["winner"] == agent.getToken()])
+    draws   = len([r for r in results if r["winner"] == "draw"])
+    print("Win       : {}%".format(int(100 * wins / test_games)))
+    print("Draw      : {}%".format(int(100 * draws / test_games)))
+    print("Loss      : {}%".format(int(100 * (test_games - wins - draws) / test_games)))
+    print()
+
+
+if __name__ == "__main__":
+    benchmarkTablebase()